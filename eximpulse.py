@@ -1,10 +1,14 @@
 import streamlit as st
-import pandas as pd
-import yfinance as yf
 import plotly.express as px
 import requests
+from requests.adapters import HTTPAdapter
+from curl_cffi import requests as curl_requests
 import base64
-from datetime import datetime
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
 # --- PAGE CONFIG ---
 st.set_page_config(
@@ -20,7 +24,7 @@ except:
     NEWS_API_KEY = ""
 
 # --- 2. CUSTOM CSS ---
-st.markdown("""
+_CSS = """
 <style>
     .stApp { background-color: #0E1117; }
     
@@ -74,7 +78,8 @@ st.markdown("""
         font-size: 13px; color: #cfcfcf;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(_CSS, unsafe_allow_html=True)
 
 # --- 3. ROBUST DATA MAPPING ---
 # Switched to ETFs (Funds) which are much more stable on the free API than Futures
@@ -91,71 +96,217 @@ COMMODITY_MAP = {
 
 # --- 4. DATA FUNCTIONS ---
 
-@st.cache_data(ttl=60)
-def get_live_price(ticker_symbol):
-    """Fetches ACTUAL live market data with a fallback mechanism."""
-    try:
-        data = yf.Ticker(ticker_symbol)
-        
-        # Robust Fetch: Try 5 days, if empty try 1 month (handles holidays/weekends)
-        history = data.history(period="5d")
-        if history.empty:
-            history = data.history(period="1mo")
-        
-        if not history.empty:
-            current_price = history['Close'].iloc[-1]
-            prev_close = history['Close'].iloc[-2]
-            change_pct = ((current_price - prev_close) / prev_close) * 100
-            
-            return {
-                "price": current_price,
-                "change": change_pct,
-                "history": history.reset_index(),
-                "currency": "USD" # ETFs are usually in USD
-            }
-        return None
-    except Exception as e:
-        return None
+@st.cache_resource(show_spinner=False)
+def _http():
+    """Pooled HTTP session for the news and weather APIs, so reruns reuse warm TLS connections."""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    return session
+
+@st.cache_resource(show_spinner=False)
+def _yahoo_session():
+    """Browser-impersonating session for Yahoo's chart API, which rejects plain python-requests clients."""
+    return curl_requests.Session(impersonate="chrome")
+
+@st.cache_resource(show_spinner=False)
+def _render_pool():
+    """Shared pool for the render-time fetches, so reruns don't spawn new threads. Sized for a few concurrent sessions."""
+    return ThreadPoolExecutor(max_workers=8)
+
+@st.cache_resource(show_spinner=False)
+def _swr_state():
+    """Process-wide store for stale_while_revalidate: cached values, last failure times, per-key refresh locks and a refresh pool."""
+    return {"values": {}, "failed_at": {}, "locks": {}, "guard": threading.Lock(), "pool": ThreadPoolExecutor(max_workers=2)}
+
+def stale_while_revalidate(soft_ttl, hard_ttl, retry_after=30):
+    """Caches results across sessions without making users wait on expiry.
+
+    Younger than soft_ttl: served as is. Between soft_ttl and hard_ttl: the stale value is served
+    and a single background refresh is queued. Older than hard_ttl (or missing): fetched inline.
+    The wrapped function raises on failure. Failures never replace a stored value, but nothing
+    older than hard_ttl is served: the caller gets None instead, and the key is not retried
+    for retry_after seconds.
+    """
+    def decorator(fn):
+        # Resolved once per decoration so hits are plain dict lookups: no cache_resource call, no hashing
+        state = _swr_state()
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            key = (fn.__qualname__, args)
+            entry = state["values"].get(key)
+            age = time.time() - entry[1] if entry else None
+            if entry and age < soft_ttl:
+                return entry[0]
+
+            def recently_failed():
+                return time.time() - state["failed_at"].get(key, 0.0) < retry_after
+
+            def refresh():
+                try:
+                    state["values"][key] = (fn(*args), time.time())
+                    state["failed_at"].pop(key, None)
+                except Exception:
+                    state["failed_at"][key] = time.time()
+
+            with state["guard"]:
+                lock = state["locks"].setdefault(key, threading.Lock())
+
+            if entry and age < hard_ttl:
+                # Non-blocking acquire dedupes refreshes; the worker releases the lock when done
+                if not recently_failed() and lock.acquire(blocking=False):
+                    def background_refresh():
+                        try:
+                            refresh()
+                        finally:
+                            lock.release()
+                    state["pool"].submit(background_refresh)
+                return entry[0]
+
+            # Negative cache: don't queue on the lock to pay the timeout again while the source is down
+            if recently_failed():
+                return None
+            with lock:
+                # Another caller may have refreshed (or just failed) while we waited on the lock
+                entry = state["values"].get(key)
+                if entry and time.time() - entry[1] < soft_ttl:
+                    return entry[0]
+                if not recently_failed():
+                    refresh()
+                entry = state["values"].get(key)
+                return entry[0] if entry and time.time() - entry[1] < hard_ttl else None
+        return wrapper
+    return decorator
+
+def _chart(sym, chart_range):
+    """Raw result block of Yahoo's daily chart endpoint for one ticker."""
+    url = f"https://query1.finance.yahoo.com/v8/finance/chart/{sym}?range={chart_range}&interval=1d"
+    return _yahoo_session().get(url, timeout=3).json()["chart"]["result"][0]
+
+def _fast_price(sym, chart_range="5d"):
+    """Daily OHLCV lists straight from Yahoo's chart JSON, skipping yfinance's DataFrame build."""
+    q = _chart(sym, chart_range)
+    c = q["indicators"]["quote"][0]
+
+    # Yahoo pads unfinished or missing sessions with nulls
+    keep = [i for i, close in enumerate(c.get("close") or []) if close is not None]
+    # Bar timestamps mark the session open in UTC; shift to exchange time to get the trading day
+    offset = q["meta"].get("gmtoffset", 0)
+    return {
+        "Date": [datetime.fromtimestamp(q["timestamp"][i] + offset, timezone.utc).date() for i in keep],
+        "Open": [c["open"][i] for i in keep],
+        "High": [c["high"][i] for i in keep],
+        "Low": [c["low"][i] for i in keep],
+        "Close": [c["close"][i] for i in keep],
+        "Volume": [c["volume"][i] for i in keep],
+    }
+
+@stale_while_revalidate(soft_ttl=60, hard_ttl=600)
+def get_live_quote(ticker_symbol):
+    """Last price and % change only, read from the chart metadata of a 1-day request (no history). Raises on failure."""
+    meta = _chart(ticker_symbol, "1d")["meta"]
+    current_price = meta["regularMarketPrice"]
+    prev_close = meta["chartPreviousClose"]
+    change_pct = ((current_price - prev_close) / prev_close) * 100
+
+    return {
+        "price": current_price,
+        "change": change_pct,
+        "currency": meta.get("currency")
+    }
+
+@stale_while_revalidate(soft_ttl=60, hard_ttl=600)
+def get_live_history(ticker_symbol):
+    """Fetches ACTUAL live market data with a fallback mechanism. Raises on failure."""
+    # Robust Fetch: Try 5 days, if too short try 1 month (handles holidays/weekends)
+    history = _fast_price(ticker_symbol, "5d")
+    if len(history["Close"]) < 2:
+        history = _fast_price(ticker_symbol, "1mo")
+    if len(history["Close"]) < 2:
+        raise ValueError(f"Not enough price history for {ticker_symbol}")
+
+    current_price = history["Close"][-1]
+    prev_close = history["Close"][-2]
+    change_pct = ((current_price - prev_close) / prev_close) * 100
+
+    return {
+        "price": current_price,
+        "change": change_pct,
+        "history": history,
+        "last": {field: values[-1] for field, values in history.items()},
+        "currency": "USD" # ETFs are usually in USD
+    }
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_news():
+    """Latest trade headlines joined into the ticker string. Raises on failure so that errors are never cached."""
+    url = f"https://newsapi.org/v2/everything?q=commodity+trade+india&sortBy=publishedAt&language=en&pageSize=10&apiKey={NEWS_API_KEY}"
+    data = _http().get(url, timeout=3).json()
+    if data.get('status') == 'error':
+        raise RuntimeError(data.get('message', 'News API error'))
+    articles = data.get('articles', [])[:10]
+    if not articles: return "No recent news found."
+    headlines = [f"📰 {a['title']} ({a['source']['name']})" for a in articles]
+    return "   +++   ".join(headlines)
+
+NEWS_RETRY_AFTER = 30 # seconds to skip News API after a failure
+
+@st.cache_resource(show_spinner=False)
+def _news_state():
+    """Last successful headline string (served during outages) and the time of the last failure."""
+    return {"last_good": None, "failed_at": 0.0}
 
 def get_news_ticker():
     if not NEWS_API_KEY:
         return "⚠️ News API Key Missing. Add to secrets.toml to see live news."
+    state = _news_state()
+    fallback = state["last_good"] or "News feed unavailable."
+    # Negative cache: don't pay the timeout again while the API is known to be down
+    if time.time() - state["failed_at"] < NEWS_RETRY_AFTER:
+        return fallback
     try:
-        url = f"https://newsapi.org/v2/everything?q=commodity+trade+india&sortBy=publishedAt&apiKey={NEWS_API_KEY}"
-        data = requests.get(url, timeout=3).json()
-        articles = data.get('articles', [])[:10]
-        if not articles: return "No recent news found."
-        headlines = [f"📰 {a['title']} ({a['source']['name']})" for a in articles]
-        return "   +++   ".join(headlines)
+        headlines = _fetch_news()
+        state["last_good"] = headlines
+        return headlines
     except:
-        return "News feed unavailable."
+        state["failed_at"] = time.time()
+        return fallback
 
-def get_weather(port):
+@st.cache_data(ttl=600, show_spinner=False)
+def _fetch_weather(port):
+    """Current conditions at a port. Raises on failure so that errors are never cached."""
     coords = {"Mundra": [22.8, 69.7], "JNPT": [18.9, 72.9], "Chennai": [13.0, 80.2], "Kolkata": [22.5, 88.3]}
     lat, lon = coords.get(port, [22.8, 69.7])
+    url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true"
+    return _http().get(url, timeout=2).json()['current_weather']
+
+def get_weather(port):
     try:
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true"
-        return requests.get(url, timeout=2).json()['current_weather']
+        return _fetch_weather(port)
     except:
         return None
 
-# --- 5. LAYOUT ---
+@st.cache_resource(show_spinner=False)
+def _warm_pool():
+    """Long-lived pool for background cache warming. Two workers keep the burst small so Yahoo doesn't throttle it."""
+    return ThreadPoolExecutor(max_workers=2)
 
-# TOP TICKER
-st.markdown(f'<div class="news-ticker-container"><div class="news-ticker-text">{get_news_ticker()}</div></div>', unsafe_allow_html=True)
-
-# SIDEBAR
-with st.sidebar:
-    st.header("⚙️ Controls")
-    currency_pair = st.selectbox("Currency Pair", ["USD/INR", "EUR/INR", "GBP/INR"])
-    selected_port = st.selectbox("Logistics Hub", ["Mundra", "JNPT", "Kolkata", "Chennai"])
-    st.divider()
-
-    # PROFILE (Safe Load)
+@st.cache_resource(show_spinner=False)
+def _profile_img_b64(path="C_39C_Sangeet Bihani.jpg"):
+    """Base64 of the static profile photo, encoded once per process. None if the file is missing."""
     try:
-        with open("C_39C_Sangeet Bihani.jpg", "rb") as f:
-            img_b64 = base64.b64encode(f.read()).decode()
-        st.markdown(f"""
+        with open(path, "rb") as f:
+            return base64.b64encode(f.read()).decode()
+    except FileNotFoundError:
+        return None
+
+@st.cache_resource(show_spinner=False)
+def _profile_html():
+    """Full sidebar profile card with the photo inlined, built once per process. None if the photo is missing."""
+    img_b64 = _profile_img_b64()
+    if not img_b64:
+        return None
+    return f"""
         <details>
             <summary>
                 <img src="data:image/jpg;base64,{img_b64}" class="profile-img">
@@ -168,10 +319,38 @@ with st.sidebar:
                 <br><span style="color:#4CAF50;">● Open to Opportunities</span>
             </div>
         </details>
-        """, unsafe_allow_html=True)
-    except:
+        """
+
+# --- 5. LAYOUT ---
+
+# SIDEBAR
+with st.sidebar:
+    st.header("⚙️ Controls")
+    currency_pair = st.selectbox("Currency Pair", ["USD/INR", "EUR/INR", "GBP/INR"])
+    selected_port = st.selectbox("Logistics Hub", ["Mundra", "JNPT", "Kolkata", "Chennai"])
+    st.divider()
+
+    # PROFILE (Safe Load)
+    profile_html = _profile_html()
+    if profile_html:
+        st.markdown(profile_html, unsafe_allow_html=True)
+    else:
         st.write("**Sangeet Bihani**")
 
+# PARALLEL FETCH: the network calls are independent, so dispatch them together
+# and only block on each result where it is rendered.
+map_fx = {"USD/INR": "INR=X", "EUR/INR": "EURINR=X", "GBP/INR": "GBPINR=X"}
+prefetch_comm_ticker = COMMODITY_MAP[st.session_state.get("selected_comm_name", next(iter(COMMODITY_MAP)))]
+
+executor = _render_pool()
+news_future = executor.submit(get_news_ticker)
+fx_future = executor.submit(get_live_quote, map_fx[currency_pair])
+weather_future = executor.submit(get_weather, selected_port)
+comm_future = executor.submit(get_live_history, prefetch_comm_ticker)
+
+# TOP TICKER
+st.markdown(f'<div class="news-ticker-container"><div class="news-ticker-text">{news_future.result()}</div></div>', unsafe_allow_html=True)
+
 # MAIN DASHBOARD
 st.title("🚢 EximPulse")
 st.caption(f"Real-Time Global Benchmarks • {datetime.now().strftime('%d %b %Y | %H:%M IST')}")
@@ -180,15 +359,14 @@ st.caption(f"Real-Time Global Benchmarks • {datetime.now().strftime('%d %b %Y
 c1, c2, c3 = st.columns(3)
 
 # 1. Real Forex
-map_fx = {"USD/INR": "INR=X", "EUR/INR": "EURINR=X", "GBP/INR": "GBPINR=X"}
-fx_data = get_live_price(map_fx[currency_pair])
+fx_data = fx_future.result()
 if fx_data:
     c1.metric(currency_pair, f"₹{fx_data['price']:.2f}", f"{fx_data['change']:.2f}%")
 else:
     c1.metric(currency_pair, "N/A", "Check Connection")
 
 # 2. Real Weather
-w = get_weather(selected_port)
+w = weather_future.result()
 if w:
     c2.metric(f"{selected_port} Conditions", f"{w['temperature']}°C", f"Wind: {w['windspeed']}km/h")
 else:
@@ -196,6 +374,11 @@ else:
 
 c3.metric("Data Integrity", "100% Real", "Source: Yahoo Finance")
 
+# CACHE WARMING: touch every benchmark in the background on each run, so switching commodity
+# in the scanner hits a warm cache. Fresh keys are a dict lookup; stale ones queue a deduplicated refresh.
+for sym in COMMODITY_MAP.values():
+    _warm_pool().submit(get_live_history, sym)
+
 st.markdown("---")
 
 # SCANNER
@@ -203,13 +386,14 @@ st.subheader("📊 Global Commodity Benchmark Scanner")
 st.caption("Tracking Major Commodity ETFs (Real-Time Price Drivers)")
 
 # Dropdown with ONLY mapped real commodities
-selected_comm_name = st.selectbox("Select Commodity Benchmark:", list(COMMODITY_MAP.keys()))
+selected_comm_name = st.selectbox("Select Commodity Benchmark:", list(COMMODITY_MAP.keys()), key="selected_comm_name")
 
 if selected_comm_name:
     ticker = COMMODITY_MAP[selected_comm_name]
     
     with st.spinner(f"Connecting to Global Exchange for {ticker}..."):
-        market_data = get_live_price(ticker)
+        # Reuse the prefetched result unless the selection changed mid-run
+        market_data = comm_future.result() if ticker == prefetch_comm_ticker else get_live_history(ticker)
     
     if market_data:
         # Show Big Price
@@ -224,8 +408,8 @@ if selected_comm_name:
         with col_chart:
             st.markdown("##### 5-Day Price Trend")
             # Real Line Chart
-            hist_df = market_data['history']
-            fig = px.line(hist_df, x="Date", y="Close", title=None, markers=True)
+            history = market_data['history']
+            fig = px.line(x=history["Date"], y=history["Close"], labels={"x": "Date", "y": "Close"}, title=None, markers=True)
             fig.update_layout(
                 paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
                 font_color="white", xaxis_title=None, yaxis_title="Price (USD)"
@@ -234,14 +418,14 @@ if selected_comm_name:
             
         with col_stats:
             st.markdown("##### Market Depth")
-            st.dataframe(pd.DataFrame({
-                "Metric": ["Open", "High", "Low"],
-                "Value": [
-                    f"${market_data['history']['Open'].iloc[-1]:.2f}",
-                    f"${market_data['history']['High'].iloc[-1]:.2f}",
-                    f"${market_data['history']['Low'].iloc[-1]:.2f}"
-                ]
-            }), hide_index=True, use_container_width=True)
+            # Plain Markdown table: no DataFrame or Arrow round-trip for three rows ($ escaped to avoid LaTeX)
+            last = market_data['last']
+            st.markdown(
+                "| Metric | Value |\n|---|---|\n"
+                f"| Open | \\${last['Open']:.2f} |\n"
+                f"| High | \\${last['High']:.2f} |\n"
+                f"| Low | \\${last['Low']:.2f} |"
+            )
             
     else:
         st.error(f"⚠️ Data Unavailable for {selected_comm_name}. The market might be closed.")